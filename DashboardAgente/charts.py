@@ -1,8 +1,10 @@
 """
 charts.py - Funciones para crear visualizaciones con Plotly
 """
+import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
+import streamlit as st
 from utils import ALXEDO_COLORS
 
 def get_alxedo_layout(title, x_title="", y_title=""):
@@ -44,25 +46,28 @@ def get_alxedo_layout(title, x_title="", y_title=""):
         )
     )
 
-def crear_histograma_duracion(conversaciones_df, turnos_promedio):
+def crear_histograma_duracion(max_turnos, turnos_promedio):
     """
     Crea histograma de duración de conversaciones.
-    
+
     Args:
-        conversaciones_df: DataFrame con datos de conversaciones
+        max_turnos: Arreglo con el número de turnos por conversación
         turnos_promedio: Promedio de turnos
-        
+
     Returns:
         Figura de Plotly
     """
+    return _histograma_duracion_cacheado(max_turnos, float(turnos_promedio))
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def _histograma_duracion_cacheado(max_turnos, turnos_promedio):
     fig = px.histogram(
-        conversaciones_df, 
-        x='max_turnos', 
+        x=max_turnos,
         nbins=15,
-        labels={'max_turnos': 'Número de Turnos', 'count': 'Frecuencia'},
+        labels={'x': 'Número de Turnos', 'y': 'Frecuencia'},
         color_discrete_sequence=[ALXEDO_COLORS['primary_blue']]
     )
-    
+
     fig.add_vline(
         x=turnos_promedio, 
         line_dash="dash", 
@@ -76,28 +81,29 @@ def crear_histograma_duracion(conversaciones_df, turnos_promedio):
     
     return fig
 
-def crear_pie_distribucion_longitud(conversaciones_df):
+def crear_pie_distribucion_longitud(max_turnos):
     """
     Crea gráfico de pie para distribución por longitud de conversaciones.
-    
+
     Args:
-        conversaciones_df: DataFrame con datos de conversaciones
-        
+        max_turnos: Arreglo con el número de turnos por conversación
+
     Returns:
         Figura de Plotly
     """
+    # Una sola pasada sobre el arreglo en lugar de cuatro máscaras encadenadas;
+    # la figura se cachea sobre los cuatro conteos resultantes
+    indices = np.digitize(max_turnos, [2, 5, 10], right=True)
+    counts = np.bincount(indices, minlength=4).tolist()
+    return _pie_distribucion_cacheado(tuple(counts))
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def _pie_distribucion_cacheado(counts):
     bins = ['1-2 turnos', '3-5 turnos', '6-10 turnos', '11+ turnos']
-    
-    counts = [
-        (conversaciones_df['max_turnos'] <= 2).sum(),
-        ((conversaciones_df['max_turnos'] >= 3) & (conversaciones_df['max_turnos'] <= 5)).sum(),
-        ((conversaciones_df['max_turnos'] >= 6) & (conversaciones_df['max_turnos'] <= 10)).sum(),
-        (conversaciones_df['max_turnos'] > 10).sum()
-    ]
-    
+
     fig = px.pie(
-        values=counts, 
-        names=bins, 
+        values=list(counts),
+        names=bins,
         hole=0.4,
         color_discrete_sequence=[
             ALXEDO_COLORS['primary_blue'], 
@@ -116,18 +122,17 @@ def crear_pie_distribucion_longitud(conversaciones_df):
     
     return fig
 
-def crear_barras_categorias(df):
+@st.cache_data(show_spinner=False, max_entries=16)
+def crear_barras_categorias(categoria_counts):
     """
     Crea gráfico de barras horizontales para categorías.
-    
+
     Args:
-        df: DataFrame con datos categorizados
-        
+        categoria_counts: Serie con el número de consultas por categoría
+
     Returns:
         Figura de Plotly
     """
-    categoria_counts = df['categoria'].value_counts()
-    
     fig = px.bar(
         y=categoria_counts.index, 
         x=categoria_counts.values, 
@@ -156,15 +161,24 @@ def crear_barras_categorias(df):
 def crear_treemap_subcategorias(df):
     """
     Crea treemap de subcategorías.
-    
+
     Args:
         df: DataFrame con datos categorizados
-        
+
     Returns:
         Figura de Plotly
     """
-    df_subcat = df.groupby(['categoria', 'subcategoria']).size().reset_index(name='count')
-    
+    # Se cachea sobre la tabla agregada (decenas de filas), no sobre el
+    # DataFrame completo, para que la clave del caché sea barata de calcular
+    df_subcat = (
+        df.groupby(['categoria', 'subcategoria'], observed=True, sort=False)
+        .size()
+        .reset_index(name='count')
+    )
+    return _treemap_subcategorias_cacheado(df_subcat)
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def _treemap_subcategorias_cacheado(df_subcat):
     fig = px.treemap(
         df_subcat, 
         path=[px.Constant("Todas las Categorías"), 'categoria', 'subcategoria'], 
@@ -1,14 +1,118 @@
 """
 data_loader.py - Funciones para carga y procesamiento de datos
 """
+import io
+
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
 import streamlit as st
 from utils import (
-    limpiar_texto, 
-    clasificar_consulta, 
-    PALABRAS_RUIDO
+    limpiar_texto,
+    clasificar_consultas,
+    es_saludo_basico_serie,
+    PALABRAS_RUIDO,
+    _huella_df,
+    _huella_serie
 )
 
+# Tamaño de archivo a partir del cual el CSV se lee por bloques
+_UMBRAL_LECTURA_CHUNKS = 200 * 1024 * 1024  # 200 MB
+_FILAS_POR_CHUNK = 200_000
+
+# Equivalente RE2 del patrón de limpieza de utils: tras plegar los acentos
+# a ASCII, la clase queda puro ASCII igual que en utils
+_PATRON_NO_PERMITIDOS_ARROW = r'[^a-z0-9\s]'
+
+def _limpiar_y_filtrar_arrow(tabla):
+    """
+    Calcula pregunta_limpia y aplica el filtro de ruido con kernels de
+    Arrow, antes de materializar nada en pandas.
+
+    Args:
+        tabla: pyarrow.Table con la columna user_utterances
+
+    Returns:
+        Tupla (df, df_limpio); las filas de ruido nunca llegan a pandas
+        en df_limpio
+    """
+    columna = pc.utf8_lower(tabla['user_utterances'])
+    # Plegado de acentos equivalente al NFKD + ascii-ignore de utils:
+    # descomponer y eliminar las marcas diacríticas combinantes
+    columna = pc.utf8_normalize(columna, form='NFKD')
+    columna = pc.replace_substring_regex(columna, r'\p{M}', '')
+    columna = pc.replace_substring_regex(columna, _PATRON_NO_PERMITIDOS_ARROW, ' ')
+    columna = pc.replace_substring_regex(columna, r'\s+', ' ')
+    columna = pc.fill_null(pc.utf8_trim_whitespace(columna), '')
+    tabla = tabla.append_column('pregunta_limpia', columna)
+
+    mascara = pc.and_(
+        pc.greater(pc.utf8_length(columna), 2),
+        pc.invert(pc.is_in(columna, value_set=pa.array(sorted(PALABRAS_RUIDO))))
+    )
+    return tabla.to_pandas(), tabla.filter(mascara).to_pandas()
+
+def _leer_csv_por_chunks(uploaded_file):
+    """
+    Lee un CSV grande por bloques para acotar la memoria pico del parser.
+
+    Args:
+        uploaded_file: Archivo cargado desde Streamlit
+
+    Returns:
+        DataFrame con el contenido del archivo
+    """
+    try:
+        chunks = list(pd.read_csv(uploaded_file, chunksize=_FILAS_POR_CHUNK))
+    except UnicodeDecodeError:
+        uploaded_file.seek(0)
+        chunks = list(pd.read_csv(uploaded_file, chunksize=_FILAS_POR_CHUNK, encoding='latin-1'))
+    return pd.concat(chunks, ignore_index=True)
+
+def _leer_csv(uploaded_file):
+    """
+    Lee el CSV con el parser multihilo de Arrow, con fallback a pandas.
+    Los archivos muy grandes se leen por bloques.
+
+    Args:
+        uploaded_file: Archivo cargado desde Streamlit
+
+    Returns:
+        Tupla (df, df_limpio); df_limpio es None cuando la limpieza y el
+        filtrado de ruido no pudieron hacerse dentro de Arrow
+    """
+    tamano = getattr(uploaded_file, 'size', None)
+    if tamano is not None and tamano > _UMBRAL_LECTURA_CHUNKS:
+        return _leer_csv_por_chunks(uploaded_file), None
+
+    try:
+        tabla = pacsv.read_csv(
+            uploaded_file,
+            read_options=pacsv.ReadOptions(use_threads=True),
+            convert_options=pacsv.ConvertOptions(
+                column_types={'turn_position': pa.int32()}
+            )
+        )
+    except pa.ArrowInvalid:
+        # Archivos que no son UTF-8 válido (p. ej. latin-1)
+        uploaded_file.seek(0)
+        return pd.read_csv(uploaded_file, encoding='latin-1'), None
+
+    if 'user_utterances' not in tabla.column_names:
+        # La verificación de columnas faltantes se reporta más adelante
+        return tabla.to_pandas(), None
+
+    if pa.types.is_binary(tabla.schema.field('user_utterances').type):
+        # Con archivos que no son UTF-8 válido el lector de Arrow no falla:
+        # infiere la columna como binary, y los kernels utf8_* reventarían
+        # después. Releer con pandas y latin-1, igual que el except de arriba
+        uploaded_file.seek(0)
+        return pd.read_csv(uploaded_file, encoding='latin-1'), None
+
+    return _limpiar_y_filtrar_arrow(tabla)
+
 @st.cache_data(ttl=3600)
 def cargar_y_procesar_datos(uploaded_file):
     """
@@ -18,65 +122,131 @@ def cargar_y_procesar_datos(uploaded_file):
         uploaded_file: Archivo cargado desde Streamlit
         
     Returns:
-        Tupla (df_original, df_limpio) con los datos procesados
+        Tupla (df_original, df_limpio, precalculados) con los datos
+        procesados y un diccionario de resultados precalculados que los
+        widgets reutilizan en cada rerun
     """
-    try:
-        df = pd.read_csv(uploaded_file, encoding='utf-8')
-    except UnicodeDecodeError:
-        df = pd.read_csv(uploaded_file, encoding='latin-1')
-    
+    df, df_limpio = _leer_csv(uploaded_file)
+
     # Verificar columnas mínimas requeridas
     columnas_requeridas = ['user_utterances', 'conversation_name', 'turn_position']
     columnas_faltantes = [col for col in columnas_requeridas if col not in df.columns]
-    
+
     if columnas_faltantes:
         st.error(f"Columnas faltantes: {', '.join(columnas_faltantes)}")
         st.stop()
-    
-    # Limpiar datos
-    df['pregunta_limpia'] = df['user_utterances'].apply(limpiar_texto)
-    
-    # Filtrar ruido
-    df_limpio = df[
-        ~df['pregunta_limpia'].isin(PALABRAS_RUIDO) & 
-        (df['pregunta_limpia'].str.len() > 2)
-    ].copy()
-    
-    # Clasificar
-    clasificacion = df_limpio.apply(clasificar_consulta, axis=1)
-    df_limpio[['categoria', 'subcategoria', 'confidence']] = pd.DataFrame(
-        clasificacion.tolist(), index=df_limpio.index
+
+    # Strings respaldados por Arrow: buffers UTF-8 contiguos en lugar de un
+    # objeto Python por fila (~3x menos memoria y kernels str más rápidos)
+    df['user_utterances'] = df['user_utterances'].astype('string[pyarrow]')
+
+    # Identificador entero compacto por conversación: los isin del filtrado
+    # comparan int32 en lugar de hashear strings largos
+    codigos, conversaciones_unicas = pd.factorize(df['conversation_name'])
+    df['conv_id'] = codigos.astype(np.int32)
+
+    # Tipos numéricos angostos: la mitad (o menos) de ancho de banda en cada
+    # filtro y agregación posterior
+    df['turn_position'] = pd.to_numeric(df['turn_position'], downcast='unsigned')
+
+    if df_limpio is None:
+        # Ruta pandas: limpiar y filtrar aquí. Los corpus conversacionales
+        # repiten mucho las mismas frases, así que se limpian solo los
+        # textos únicos y se mapea de vuelta
+        unicos = pd.Index(df['user_utterances'].dropna().unique())
+        limpios = pd.Series(unicos.map(limpiar_texto), index=unicos)
+        df['pregunta_limpia'] = df['user_utterances'].map(limpios).fillna('').astype('string[pyarrow]')
+
+        # Filtrar ruido: una sola máscara y un único indexado; el indexado
+        # booleano ya materializa un DataFrame nuevo, no hace falta .copy()
+        mascara_valida = (
+            (df['pregunta_limpia'].str.len() > 2) &
+            ~df['pregunta_limpia'].isin(PALABRAS_RUIDO)
+        )
+        df_limpio = df.loc[mascara_valida]
+    else:
+        # La limpieza y el filtrado de ruido ya ocurrieron dentro de Arrow
+        df['pregunta_limpia'] = df['pregunta_limpia'].astype('string[pyarrow]')
+        df_limpio = df_limpio.astype({
+            'user_utterances': 'string[pyarrow]',
+            'pregunta_limpia': 'string[pyarrow]'
+        })
+        df_limpio['conv_id'] = conversaciones_unicas.get_indexer(
+            df_limpio['conversation_name']
+        ).astype(np.int32)
+        df_limpio['turn_position'] = pd.to_numeric(
+            df_limpio['turn_position'], downcast='unsigned'
+        )
+
+    # Clasificar (vectorizado sobre toda la columna)
+    clasificacion = clasificar_consultas(df_limpio)
+    df_limpio = df_limpio.assign(
+        categoria=clasificacion['categoria'],
+        subcategoria=clasificacion['subcategoria'],
+        confidence=clasificacion['confidence']
     )
-    
-    return df, df_limpio
 
-def aplicar_filtros(df, categoria='Todas', subcategoria='Todas', turnos_min=1):
+    # Tipos categóricos: los filtros y groupby posteriores comparan códigos
+    # enteros en lugar de strings
+    for columna in ('categoria', 'subcategoria', 'conversation_name'):
+        df_limpio[columna] = df_limpio[columna].astype('category')
+
+    # Resultados precalculados una sola vez por carga (esta función está
+    # cacheada), para que los widgets no repitan pasadas O(N) en cada rerun
+    mascara_faq = (
+        ~es_saludo_basico_serie(df_limpio['pregunta_limpia']) &
+        (df_limpio['categoria'] != 'Interacciones Generales')
+    )
+    precalculados = {
+        'turnos_por_conversacion': df.groupby('conv_id', sort=False)['turn_position'].max(),
+        'conteo_categorias': df_limpio['categoria'].value_counts(),
+        'conteo_preguntas_faq': df_limpio.loc[mascara_faq, 'pregunta_limpia'].value_counts(),
+        'subcategorias_por_categoria': {
+            cat: sorted(grupo['subcategoria'].unique().tolist())
+            for cat, grupo in df_limpio.groupby('categoria', observed=True, sort=False)
+        },
+    }
+
+    return df, df_limpio, precalculados
+
+# Los DataFrames y Series se fingerprintan con las huellas baratas de utils:
+# hashear su contenido completo en cada hit costaría más que el filtrado
+@st.cache_data(show_spinner=False, max_entries=16,
+               hash_funcs={pd.DataFrame: _huella_df, pd.Series: _huella_serie})
+def aplicar_filtros(df, categoria='Todas', subcategoria='Todas', turnos_min=1,
+                    turnos_por_conversacion=None):
     """
     Aplica filtros al DataFrame.
-    
+
     Args:
         df: DataFrame original
         categoria: Categoría seleccionada
         subcategoria: Subcategoría seleccionada
         turnos_min: Número mínimo de turnos
-        
+        turnos_por_conversacion: Serie precalculada con el turno máximo por
+            conversación, indexada por conv_id; si es None se calcula sobre df
+
     Returns:
         DataFrame filtrado
     """
-    df_filtrado = df.copy()
-    
+    # Acumular una sola máscara booleana y hacer un único indexado al final,
+    # en lugar de crear un DataFrame intermedio por cada filtro
+    mascara = np.ones(len(df), dtype=bool)
+
     if categoria != 'Todas':
-        df_filtrado = df_filtrado[df_filtrado['categoria'] == categoria]
-    
+        mascara &= (df['categoria'] == categoria).to_numpy()
+
     if subcategoria != 'Todas':
-        df_filtrado = df_filtrado[df_filtrado['subcategoria'] == subcategoria]
-    
-    # Filtrar por turnos mínimos (a nivel de conversación)
-    conversaciones_validas = df.groupby('conversation_name')['turn_position'].max()
-    conversaciones_validas = conversaciones_validas[conversaciones_validas >= turnos_min].index
-    df_filtrado = df_filtrado[df_filtrado['conversation_name'].isin(conversaciones_validas)]
-    
-    return df_filtrado
+        mascara &= (df['subcategoria'] == subcategoria).to_numpy()
+
+    # Filtrar por turnos mínimos (a nivel de conversación); la membresía se
+    # resuelve sobre los conv_id int32 en lugar de los nombres string
+    if turnos_por_conversacion is None:
+        turnos_por_conversacion = df.groupby('conv_id', observed=True)['turn_position'].max()
+    conversaciones_validas = turnos_por_conversacion.index[turnos_por_conversacion >= turnos_min]
+    mascara &= np.isin(df['conv_id'].to_numpy(), conversaciones_validas.to_numpy())
+
+    return df.loc[mascara]
 
 def preparar_datos_descarga(df):
     """
@@ -88,31 +258,45 @@ def preparar_datos_descarga(df):
     Returns:
         Bytes del CSV codificado
     """
-    return df.to_csv(index=False).encode('utf-8')
+    # Serializar con el escritor CSV de Arrow directamente a un buffer de
+    # bytes, sin materializar el CSV completo como str intermedio. El
+    # conv_id interno no forma parte del artefacto exportado
+    df = df.drop(columns='conv_id', errors='ignore')
+    buffer = io.BytesIO()
+    pacsv.write_csv(pa.Table.from_pandas(df, preserve_index=False), buffer)
+    return buffer.getvalue()
 
-def obtener_top_preguntas(df, n=15, filtrar_saludos=True):
+@st.cache_data(show_spinner=False, max_entries=16,
+               hash_funcs={pd.DataFrame: _huella_df, pd.Series: _huella_serie})
+def obtener_top_preguntas(df, n=15, filtrar_saludos=True, conteo_preguntas=None):
     """
     Obtiene las preguntas más frecuentes.
-    
+
     Args:
         df: DataFrame con los datos
         n: Número de preguntas a retornar
         filtrar_saludos: Si se deben filtrar saludos básicos
-        
+        conteo_preguntas: Serie precalculada de frecuencias por pregunta
+            (ya filtrada según filtrar_saludos); si es None se calcula
+
     Returns:
         DataFrame con las top preguntas y sus frecuencias
     """
-    from utils import es_saludo_basico
-    
-    df_faqs = df.copy()
-    
-    # Filtrar saludos básicos si se requiere
-    if filtrar_saludos:
-        df_faqs = df_faqs[~df_faqs['pregunta_limpia'].apply(es_saludo_basico)]
-        # Filtrar también por categoría para excluir interacciones generales
-        df_faqs = df_faqs[df_faqs['categoria'] != 'Interacciones Generales']
-    
-    top_questions = df_faqs['pregunta_limpia'].value_counts().head(n)
+    if conteo_preguntas is None:
+        df_faqs = df
+
+        # Filtrar saludos básicos si se requiere
+        if filtrar_saludos:
+            # Máscara vectorizada en lugar de un apply fila por fila; se
+            # excluyen también las interacciones generales
+            df_faqs = df_faqs[
+                ~es_saludo_basico_serie(df_faqs['pregunta_limpia']) &
+                (df_faqs['categoria'] != 'Interacciones Generales')
+            ]
+
+        conteo_preguntas = df_faqs['pregunta_limpia'].value_counts()
+
+    top_questions = conteo_preguntas.head(n)
     
     if len(top_questions) > 0:
         df_display = pd.DataFrame({
@@ -2,7 +2,25 @@
 utils.py - Funciones auxiliares, configuración y constantes
 """
 import re
+import unicodedata
+from functools import lru_cache
+
+import numpy as np
 import pandas as pd
+import streamlit as st
+
+try:
+    import ahocorasick
+except ImportError:
+    # Dependencia opcional; sin ella la clasificación escalar usa el
+    # recorrido de keywords puro Python
+    ahocorasick = None
+
+try:
+    import polars as pl
+except ImportError:
+    # Dependencia opcional; sin ella las métricas se agregan con pandas
+    pl = None
 
 # --- PALETA DE COLORES CORPORATIVOS ---
 ALXEDO_COLORS = {
@@ -56,12 +74,138 @@ CATEGORIAS_SUBCATEGORIAS = {
     }
 }
 
+def _quitar_acentos(texto):
+    """
+    Quita acentos descomponiendo con NFKD y descartando solo las marcas
+    combinantes. El resto de caracteres no ASCII se conserva, para que el
+    patrón de limpieza los convierta en espacio igual que la ruta Arrow
+    (borrarlos pegaría las palabras adyacentes).
+
+    Args:
+        texto: String a normalizar
+
+    Returns:
+        String sin marcas diacríticas
+    """
+    return ''.join(
+        caracter for caracter in unicodedata.normalize('NFKD', texto)
+        if not unicodedata.combining(caracter)
+    )
+
+# Versión aplanada de la clasificación: (categoria, subcategoria, keywords).
+# Se construye una sola vez al importar para la clasificación vectorizada.
+# Las keywords se normalizan a ASCII igual que el texto limpio, para que
+# entradas como "dirección" o "contraseña" sigan coincidiendo
+SUBCATEGORIAS_PLANAS = [
+    (categoria, subcategoria, tuple(_quitar_acentos(k) for k in keywords))
+    for categoria, subcategorias in CATEGORIAS_SUBCATEGORIAS.items()
+    for subcategoria, keywords in subcategorias.items()
+]
+
+# Recíprocos de len(keywords) por subcategoría, precalculados para no
+# repetir la división en los bucles de clasificación; float32 compartido
+# por las rutas escalar y vectorizada
+_INV_LEN_SUBCATS = np.array(
+    [1.0 / len(kws) for _, _, kws in SUBCATEGORIAS_PLANAS], dtype=np.float32
+)
+
+# Etiquetas por subcategoría en arreglos paralelos, congelados al importar;
+# la última posición es el valor por defecto, al que apunta el índice -1
+# cuando una fila no tiene ningún match
+_CATS = np.array([c for c, _, _ in SUBCATEGORIAS_PLANAS] + ["Sin Clasificar"])
+_SUBS = np.array([s for _, s, _ in SUBCATEGORIAS_PLANAS] + ["Otros"])
+
+def _construir_matriz_pertenencia():
+    """
+    Construye la lista de keywords únicas y su matriz de pertenencia.
+
+    La matriz (n_keywords, n_subcategorias) tiene un 1 donde la keyword
+    pertenece a la subcategoría; un producto matricial contra el vector de
+    presencia de keywords da los conteos de todas las subcategorías a la vez.
+
+    Returns:
+        Tupla (keywords_unicas, matriz int8)
+    """
+    keywords_unicas = tuple(dict.fromkeys(
+        keyword for _, _, keywords in SUBCATEGORIAS_PLANAS for keyword in keywords
+    ))
+    indice = {keyword: i for i, keyword in enumerate(keywords_unicas)}
+
+    matriz = np.zeros((len(keywords_unicas), len(SUBCATEGORIAS_PLANAS)), dtype=np.int8)
+    for j, (_, _, keywords) in enumerate(SUBCATEGORIAS_PLANAS):
+        for keyword in keywords:
+            matriz[indice[keyword], j] = 1
+    return keywords_unicas, matriz
+
+_KEYWORDS_UNICAS, _MATRIZ_PERTENENCIA = _construir_matriz_pertenencia()
+
+# Alternación maestra de keywords (las más largas primero, para que en cada
+# posición gane la keyword más específica) y mapa keyword -> índices de
+# subcategoría; juntas recorren la pregunta una sola vez en la ruta escalar
+# cuando pyahocorasick no está disponible
+_REGEX_KEYWORDS = re.compile('|'.join(
+    re.escape(keyword)
+    for keyword in sorted(_KEYWORDS_UNICAS, key=len, reverse=True)
+))
+
+_KW_A_SUBCATS = {}
+for _idx, (_, _, _keywords) in enumerate(SUBCATEGORIAS_PLANAS):
+    for _keyword in _keywords:
+        _KW_A_SUBCATS.setdefault(_keyword, []).append(_idx)
+del _idx, _keywords, _keyword
+
+def _construir_automata():
+    """
+    Construye el autómata Aho-Corasick con todas las keywords.
+
+    Cada palabra del autómata lleva como valor la keyword y los índices de
+    las subcategorías de SUBCATEGORIAS_PLANAS donde aparece (una keyword
+    puede pertenecer a más de una subcategoría).
+
+    Returns:
+        Automaton listo para iterar, o None si pyahocorasick no está
+        instalado
+    """
+    if ahocorasick is None:
+        return None
+
+    automata = ahocorasick.Automaton()
+    for idx, (_, _, keywords) in enumerate(SUBCATEGORIAS_PLANAS):
+        for keyword in keywords:
+            if keyword in automata:
+                automata.get(keyword)[1].append(idx)
+            else:
+                automata.add_word(keyword, (keyword, [idx]))
+    automata.make_automaton()
+    return automata
+
+# Construido de forma perezosa en la primera clasificación escalar, para no
+# pagar la construcción al importar cuando solo se usa la ruta vectorizada
+_AUTOMATA_KEYWORDS = None
+
+def _obtener_automata():
+    """
+    Devuelve el autómata de keywords, construyéndolo la primera vez.
+
+    Returns:
+        Automaton compartido, o None si pyahocorasick no está instalado
+    """
+    global _AUTOMATA_KEYWORDS
+    if _AUTOMATA_KEYWORDS is None and ahocorasick is not None:
+        _AUTOMATA_KEYWORDS = _construir_automata()
+    return _AUTOMATA_KEYWORDS
+
 # Palabras que se consideran saludos o interacciones básicas
-SALUDOS_BASICOS = {
-    "hola", "buenos dias", "buenas tardes", "buenas noches", "gracias", 
+SALUDOS_BASICOS = frozenset({
+    "hola", "buenos dias", "buenas tardes", "buenas noches", "gracias",
     "adios", "si", "no", "ok", "aja", "bien", "perfecto", "excelente",
     "de acuerdo", "entendido", "claro", "por favor", "disculpa"
-}
+})
+
+# Alternación precompilada de saludos para el filtrado vectorizado
+SALUDOS_REGEX = re.compile(
+    r'\b(?:' + '|'.join(re.escape(s) for s in sorted(SALUDOS_BASICOS, key=len, reverse=True)) + r')\b'
+)
 
 # Palabras que se consideran ruido
 PALABRAS_RUIDO = {
@@ -70,23 +214,40 @@ PALABRAS_RUIDO = {
     "con", "para", "por"
 }
 
+# Patrones de limpieza precompilados una sola vez al importar el módulo.
+# El texto ya llega plegado a ASCII, así que la clase es puro ASCII y el
+# motor de regex no necesita la ruta Unicode
+_RE_NO_PERMITIDOS = re.compile(r'[^a-z0-9\s]')
+_RE_ESPACIOS = re.compile(r'\s+')
+# Marcas diacríticas combinantes (U+0300-U+036F) que produce la
+# descomposición NFKD del texto latino; equivalente al \p{M} de la ruta
+# Arrow. La clase se arma con caracteres literales porque el patrón también
+# lo consume RE2 (vía str.replace sobre Series respaldadas por Arrow), que
+# no comparte la sintaxis \uXXXX de re
+_RE_MARCAS_COMBINANTES = re.compile('[{}-{}]'.format(chr(0x0300), chr(0x036F)))
+
 def limpiar_texto(texto):
     """
     Limpia y normaliza texto.
-    
+
     Args:
         texto: String a limpiar
-        
+
     Returns:
         String limpio y normalizado
     """
     if not isinstance(texto, str):
         return ""
-    texto = texto.lower().strip()
-    texto = re.sub(r'[^\w\sáéíóúñü]', ' ', texto)
-    texto = re.sub(r'\s+', ' ', texto).strip()
-    return texto
+    return _limpiar_texto_cacheado(texto)
+
+@lru_cache(maxsize=65536)
+def _limpiar_texto_cacheado(texto):
+    # split() sin argumentos colapsa cualquier corrida de espacios y
+    # recorta los extremos en C, sin una segunda pasada de regex
+    texto = _quitar_acentos(texto.lower())
+    return ' '.join(_RE_NO_PERMITIDOS.sub(' ', texto).split())
 
+@lru_cache(maxsize=65536)
 def es_saludo_basico(texto):
     """
     Determina si un texto es un saludo básico.
@@ -97,9 +258,62 @@ def es_saludo_basico(texto):
     Returns:
         Boolean indicando si es saludo básico
     """
-    texto_limpio = limpiar_texto(texto)
-    palabras = set(texto_limpio.split())
-    return len(palabras.intersection(SALUDOS_BASICOS)) > 0 and len(palabras) <= 3
+    # Escaneo directo con corte temprano, sin materializar un set temporal
+    palabras = limpiar_texto(texto).split()
+    if len(palabras) > 3:
+        return False
+    return any(palabra in SALUDOS_BASICOS for palabra in palabras)
+
+def es_saludo_basico_serie(serie):
+    """
+    Versión vectorizada de es_saludo_basico para una Serie ya limpia.
+
+    Args:
+        serie: Serie de textos limpios (salida de limpiar_texto)
+
+    Returns:
+        Serie booleana indicando qué textos son saludos básicos
+    """
+    # El texto limpio tiene espacios colapsados, por lo que el número de
+    # palabras es el número de espacios + 1
+    # Se pasa el patrón como string (no el objeto compilado) para que las
+    # Series respaldadas por Arrow usen su kernel de regex nativo
+    pocas_palabras = serie.str.count(' ') <= 2
+    return pocas_palabras & serie.str.contains(SALUDOS_REGEX.pattern)
+
+@lru_cache(maxsize=65536)
+def _es_solo_saludo(texto):
+    """
+    Determina si un texto limpio se compone únicamente de saludos básicos.
+
+    A diferencia de es_saludo_basico (que acepta cualquier texto corto que
+    contenga un saludo), aquí no puede quedar nada fuera de los saludos:
+    es la condición para saltarse la clasificación por keywords.
+
+    Args:
+        texto: String limpio a evaluar
+
+    Returns:
+        Boolean indicando si el texto consiste solo en saludos
+    """
+    palabras = texto.split()
+    if not palabras or len(palabras) > 3:
+        return False
+    return not SALUDOS_REGEX.sub('', texto).strip()
+
+def _es_solo_saludo_serie(serie):
+    """
+    Versión vectorizada de _es_solo_saludo para una Serie ya limpia.
+
+    Args:
+        serie: Serie de textos limpios (salida de limpiar_texto)
+
+    Returns:
+        Serie booleana indicando qué textos consisten solo en saludos
+    """
+    pocas_palabras = serie.str.count(' ') <= 2
+    residuo = serie.str.replace(SALUDOS_REGEX.pattern, '', regex=True).str.strip()
+    return pocas_palabras & (serie.str.len() > 0) & (residuo == '')
 
 def clasificar_consulta(row):
     """
@@ -117,27 +331,221 @@ def clasificar_consulta(row):
         return intent, "Por Intent", 0.9
     
     pregunta = row.get('pregunta_limpia', limpiar_texto(row['user_utterances']))
+
+    # Atajo solo para textos que son puro saludo: cualquier otra palabra
+    # presente podría ser una keyword, y esas filas deben pasar por el
+    # escaneo completo
+    if _es_solo_saludo(pregunta):
+        return "Interacciones Generales", "Saludos y Cortesía", 0.95
+
+    # Una sola pasada sobre la pregunta en lugar de probar cada keyword por
+    # separado; las keywords repetidas cuentan una vez, igual que con el
+    # operador in
+    encontradas = {}
+    automata = _obtener_automata()
+    if automata is not None:
+        for _, (keyword, indices) in automata.iter(pregunta):
+            for idx in indices:
+                encontradas.setdefault(idx, set()).add(keyword)
+    else:
+        # Fallback sin pyahocorasick: la alternación maestra también camina
+        # la pregunta una sola vez; al ordenar las keywords de más larga a
+        # más corta, en cada posición gana la más específica
+        for coincidencia in _REGEX_KEYWORDS.finditer(pregunta):
+            keyword = coincidencia.group()
+            for idx in _KW_A_SUBCATS[keyword]:
+                encontradas.setdefault(idx, set()).add(keyword)
+
     mejor_match = None
     mejor_score = 0
-    
-    for categoria, subcategorias in CATEGORIAS_SUBCATEGORIAS.items():
-        for subcategoria, keywords in subcategorias.items():
-            matches = sum(1 for keyword in keywords if keyword in pregunta)
-            if matches > 0:
-                score = matches / len(keywords)
-                if score > mejor_score:
-                    mejor_score = score
-                    mejor_match = (categoria, subcategoria, score)
-    
+    # Recorrer por índice de subcategoría para que los empates se resuelvan
+    # por orden de declaración, igual que el argmax de la ruta vectorizada
+    # (encontradas se llena en orden de aparición en el texto)
+    for idx, keywords_encontradas in sorted(encontradas.items()):
+        categoria, subcategoria, _ = SUBCATEGORIAS_PLANAS[idx]
+        score = float(len(keywords_encontradas) * _INV_LEN_SUBCATS[idx])
+        if score > mejor_score:
+            mejor_score = score
+            mejor_match = (categoria, subcategoria, score)
+
     if mejor_match:
-        return mejor_match[0], mejor_match[1], mejor_match[2]
-    
+        return mejor_match
+
     return "Sin Clasificar", "Otros", 0.0
 
+def asegurar_pregunta_limpia(df):
+    """
+    Garantiza que el DataFrame tenga la columna pregunta_limpia.
+
+    Si falta, se calcula para toda la columna con operaciones str
+    vectorizadas, en lugar de limpiar fila por fila.
+
+    Args:
+        df: DataFrame con la columna user_utterances
+
+    Returns:
+        DataFrame con la columna pregunta_limpia
+    """
+    if 'pregunta_limpia' in df.columns:
+        return df
+
+    limpia = (
+        df['user_utterances']
+        .fillna('')
+        .str.lower()
+        .str.normalize('NFKD')
+        .str.replace(_RE_MARCAS_COMBINANTES.pattern, '', regex=True)
+        .str.replace(_RE_NO_PERMITIDOS.pattern, ' ', regex=True)
+        .str.replace(_RE_ESPACIOS.pattern, ' ', regex=True)
+        .str.strip()
+    )
+    return df.assign(pregunta_limpia=limpia)
+
+def clasificar_consultas(df):
+    """
+    Clasifica todas las consultas de un DataFrame de forma vectorizada.
+
+    En lugar de invocar clasificar_consulta fila por fila, recorre las
+    subcategorías y cuenta las keywords presentes con operaciones
+    vectorizadas de pandas, eligiendo la subcategoría de mayor score.
+
+    Args:
+        df: DataFrame con la columna pregunta_limpia
+
+    Returns:
+        DataFrame con columnas categoria, subcategoria y confidence
+    """
+    df = asegurar_pregunta_limpia(df)
+    preguntas = df['pregunta_limpia']
+    n = len(df)
+
+    # Atajo para las filas que son puro saludo (una fracción grande de los
+    # corpus de chat): se saltan el escaneo de keywords completo. Las que
+    # mezclan un saludo con otras palabras sí se clasifican, porque esas
+    # palabras pueden ser keywords
+    es_saludo = _es_solo_saludo_serie(preguntas).to_numpy(dtype=bool, na_value=False)
+    no_saludo = ~es_saludo
+    preguntas_a_clasificar = preguntas[no_saludo]
+
+    categorias = np.full(n, "Interacciones Generales", dtype=object)
+    subcategorias = np.full(n, "Saludos y Cortesía", dtype=object)
+    confidences = np.full(n, 0.95, dtype=np.float32)
+
+    if len(preguntas_a_clasificar) > 0:
+        # Matriz de presencia (n_filas, n_keywords): una pasada C por
+        # keyword única (las compartidas entre subcategorías se buscan una
+        # sola vez)
+        presentes = np.empty(
+            (len(preguntas_a_clasificar), len(_KEYWORDS_UNICAS)), dtype=np.int8
+        )
+        for idx, keyword in enumerate(_KEYWORDS_UNICAS):
+            presentes[:, idx] = preguntas_a_clasificar.str.contains(
+                keyword, regex=False
+            ).to_numpy(dtype=bool, na_value=False)
+
+        # Un solo producto matricial resuelve los conteos de todas las
+        # subcategorías sin ramas
+        conteos = presentes @ _MATRIZ_PERTENENCIA
+        scores = conteos * _INV_LEN_SUBCATS
+
+        mejor_score = scores.max(axis=1)
+        mejor_idx = scores.argmax(axis=1)
+        # Sin ningún match: apuntar al valor por defecto al final de los
+        # arreglos de etiquetas congelados (_CATS/_SUBS)
+        mejor_idx[mejor_score == 0] = -1
+
+        categorias[no_saludo] = _CATS[mejor_idx]
+        subcategorias[no_saludo] = _SUBS[mejor_idx]
+        confidences[no_saludo] = mejor_score
+
+    resultado = pd.DataFrame({
+        'categoria': categorias,
+        'subcategoria': subcategorias,
+        'confidence': confidences
+    }, index=df.index)
+
+    # Priorizar intent nativo si existe
+    if 'intent_name' in df.columns:
+        con_intent = df['intent_name'].notna() & ~df['intent_name'].isin(
+            ['UNSPECIFIED', '', 'Default Welcome Intent']
+        )
+        if con_intent.any():
+            intents = df.loc[con_intent, 'intent_name'].str.replace('_', ' ').str.title()
+            resultado.loc[con_intent, 'categoria'] = intents
+            resultado.loc[con_intent, 'subcategoria'] = "Por Intent"
+            resultado.loc[con_intent, 'confidence'] = 0.9
+
+    return resultado
+
+def _agregar_conversaciones_polars(df):
+    """
+    Agrega las métricas por conversación con Polars.
+
+    Args:
+        df: DataFrame de pandas con los datos de conversación
+
+    Returns:
+        DataFrame de pandas con una fila por conversación
+    """
+    columnas = ['conversation_name', 'turn_position', 'user_utterances']
+    opcionales = [
+        col for col in ('live_agent_handoff', 'end_session_exit')
+        if col in df.columns
+    ]
+    pl_df = pl.from_pandas(df[columnas + opcionales])
+
+    agregaciones = [
+        pl.col('turn_position').max().alias('max_turnos'),
+        pl.col('user_utterances').count().alias('total_interacciones'),
+    ]
+    agregaciones += [pl.col(col).max() for col in opcionales]
+
+    # group_by de polars conserva los null como un grupo propio; se
+    # descartan para igualar al groupby de pandas, que los omite
+    return (
+        pl_df.drop_nulls('conversation_name')
+        .group_by('conversation_name')
+        .agg(agregaciones)
+        .to_pandas()
+    )
+
+def _huella_df(df):
+    """
+    Clave de caché barata para un DataFrame ya cargado: forma, columnas y
+    extremos del dataset, sin hashear el contenido completo.
+
+    Args:
+        df: DataFrame a fingerprintar
+
+    Returns:
+        Tupla hashable que identifica el dataset cargado
+    """
+    extremos = ()
+    if len(df) > 0 and 'conversation_name' in df.columns:
+        extremos = (df['conversation_name'].iloc[0], df['conversation_name'].iloc[-1])
+    return (df.shape, tuple(df.columns), extremos)
+
+def _huella_serie(serie):
+    """
+    Clave de caché barata para una Serie precalculada en la carga: forma,
+    nombre y extremos, sin hashear el contenido completo.
+
+    Args:
+        serie: Serie a fingerprintar
+
+    Returns:
+        Tupla hashable que identifica la Serie
+    """
+    extremos = ()
+    if len(serie) > 0:
+        extremos = (serie.index[0], serie.index[-1], serie.iloc[0], serie.iloc[-1])
+    return (serie.shape, serie.name, extremos)
+
+@st.cache_data(show_spinner=False, hash_funcs={pd.DataFrame: _huella_df})
 def calcular_metricas_conversacion(df):
     """
     Calcula métricas básicas de conversación.
-    
+
     Args:
         df: DataFrame con los datos de conversación
         
@@ -146,24 +554,46 @@ def calcular_metricas_conversacion(df):
     """
     if df.empty:
         return {}
-    
-    # Agrupar por conversación
-    conversaciones = df.groupby('conversation_name').agg({
-        'turn_position': 'max',
-        'user_utterances': 'count'
-    }).reset_index()
-    conversaciones.columns = ['conversation_name', 'max_turnos', 'total_interacciones']
-    
-    # Detectar escalamientos si existe la columna
+
+    if pl is not None:
+        # Agregación multihilo en Rust; el resto del cálculo sigue en pandas
+        conversaciones = _agregar_conversaciones_polars(df)
+    else:
+        # Agrupar sobre códigos categóricos en lugar de hashear un string
+        # por fila; el DataFrame original llega con conversation_name object
+        if not isinstance(df['conversation_name'].dtype, pd.CategoricalDtype):
+            df = df.assign(conversation_name=df['conversation_name'].astype('category'))
+
+        # Una sola construcción de la tabla hash del groupby para todas las
+        # agregaciones, incluidas las opcionales; la agregación nombrada
+        # produce las columnas finales sin reset_index ni rename posteriores
+        agg_spec = {
+            'max_turnos': ('turn_position', 'max'),
+            'total_interacciones': ('user_utterances', 'count'),
+        }
+        if 'live_agent_handoff' in df.columns:
+            agg_spec['live_agent_handoff'] = ('live_agent_handoff', 'max')
+        if 'end_session_exit' in df.columns:
+            agg_spec['end_session_exit'] = ('end_session_exit', 'max')
+
+        conversaciones = df.groupby('conversation_name', sort=False, observed=True).agg(**agg_spec)
+
+    # Tipos angostos para los agregados: menos memoria en el caché y menos
+    # ancho de banda en los cálculos que siguen
+    conversaciones = conversaciones.astype({
+        'max_turnos': 'int32',
+        'total_interacciones': 'int32'
+    })
+
+    # Escalamientos y finalizaciones exitosas, si existen las columnas
     escalamientos = 0
-    if 'live_agent_handoff' in df.columns:
-        escalamientos = df.groupby('conversation_name')['live_agent_handoff'].max().sum()
-    
-    # Detectar finalizaciones exitosas si existe la columna
+    if 'live_agent_handoff' in conversaciones.columns:
+        escalamientos = conversaciones['live_agent_handoff'].sum()
+
     finalizaciones = 0
-    if 'end_session_exit' in df.columns:
-        finalizaciones = df.groupby('conversation_name')['end_session_exit'].max().sum()
-    
+    if 'end_session_exit' in conversaciones.columns:
+        finalizaciones = conversaciones['end_session_exit'].sum()
+
     total_conversaciones = len(conversaciones)
     
     return {
@@ -174,13 +604,18 @@ def calcular_metricas_conversacion(df):
         'escalamientos': escalamientos,
         'finalizaciones': finalizaciones,
         'conversaciones_largas': (conversaciones['max_turnos'] > 10).sum(),
-        'conversaciones_df': conversaciones
+        # Las gráficas solo necesitan los turnos por conversación; exponer
+        # el arreglo int32 en lugar del DataFrame completo evita retener una
+        # segunda copia del agregado en el caché
+        'max_turnos': conversaciones['max_turnos'].to_numpy(dtype=np.int32)
     }
 
+@lru_cache(maxsize=None)
 def get_custom_css():
     """
     Retorna el CSS personalizado para la aplicación.
-    
+    El resultado se cachea: el CSS solo depende de constantes del módulo.
+
     Returns:
         String con el CSS
     """